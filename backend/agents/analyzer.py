@@ -1,17 +1,19 @@
-import json
 import os
 from dotenv import load_dotenv
 import google.generativeai as genai
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
+from agents.prompt_budget import encode_board, TokenBudget, TokenUsageLog
+from agents.telemetry import check_thresholds
+from agents.report_sink import ReportSink
 
 load_dotenv()
 
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
 
 class AnalyzerAgent:
-    def __init__(self):
+    def __init__(self, results_token_budget=1000, performance_thresholds=None, report_sink: ReportSink = None):
         genai.configure(api_key=GOOGLE_API_KEY)
         self.llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.0, google_api_key=GOOGLE_API_KEY)
 
@@ -24,6 +26,8 @@ class AnalyzerAgent:
             - Expected Results: "{expected_results}"
             - Actual Observed Results: "{actual_results}"
 
+            Boards may be encoded as space-separated "value:indices" entries. Each entry lists every board index holding that value; "a-b" is the run of indices a through b.
+
             Analyze these results and provide your verdict.
             Return a single JSON object with two keys: "verdict" (string: "Passed" or "Failed") and "reason" (string: a brief explanation).
             \n{format_instructions}\n
@@ -31,7 +35,33 @@ class AnalyzerAgent:
             input_variables=["expected_results", "actual_results"],
             partial_variables={"format_instructions": JsonOutputParser().get_format_instructions()}
         )
-        self.chain = self.analysis_prompt | self.llm | JsonOutputParser()
+        # The parser runs separately so the LLM message's usage_metadata can be recorded.
+        self.chain = self.analysis_prompt | self.llm
+        self.parser = JsonOutputParser()
+        self.results_budget = TokenBudget(results_token_budget)
+        self.token_usage = TokenUsageLog("AnalyzerAgent")
+        # None falls back to telemetry.DEFAULT_PERFORMANCE_THRESHOLDS; {} disables the checks.
+        self.performance_thresholds = performance_thresholds
+        self.report_sink = report_sink or ReportSink()
+
+    def _fit_inputs(self, test_case_report):
+        """Compact, budgeted prompt inputs. The board after the clicks is what the verdict
+        hinges on, so it is kept ahead of the board before when the budget runs out."""
+        boards = test_case_report.get('boards')
+        if not boards:
+            return self.results_budget.fit([
+                ("expected_results", str(test_case_report['expected_results']), 0),
+                ("actual_results", test_case_report['actual_results'], 1),
+            ])
+        fitted = self.results_budget.fit([
+            ("expected_results", str(test_case_report['expected_results']), 0),
+            ("board_after", encode_board(boards['after']), 1),
+            ("board_before", encode_board(boards['before']), 2),
+        ])
+        return {
+            "expected_results": fitted["expected_results"],
+            "actual_results": f"Board before: {fitted['board_before']}. Board after: {fitted['board_after']}.",
+        }
 
     def analyze_test_case(self, test_case_report):
         test_case_id = test_case_report['test_case_id']
@@ -40,10 +70,14 @@ class AnalyzerAgent:
         
         try:
             # ... (analysis logic is correct) ...
-            analysis_result = self.chain.invoke({
+            raw_inputs = {
                 "expected_results": test_case_report['expected_results'],
                 "actual_results": test_case_report['actual_results']
-            })
+            }
+            inputs = self._fit_inputs(test_case_report)
+            message = self.chain.invoke(inputs)
+            self.token_usage.record("analyze_test_case", self.analysis_prompt, raw_inputs, inputs, message)
+            analysis_result = self.parser.invoke(message)
             verdict = analysis_result.get('verdict', 'Failed')
             reason = analysis_result.get('reason', 'LLM analysis did not provide a reason.')
             
@@ -52,17 +86,17 @@ class AnalyzerAgent:
             verdict = "Failed"
             reason = f"Analysis failed due to a processing error: {e}"
 
-        test_case_report['analysis'] = {'verdict': verdict, 'reason': reason}
+        # A functionally correct run still fails if the game responded too slowly.
+        performance_violations = check_thresholds(test_case_report.get('performance'), self.performance_thresholds)
+        if performance_violations:
+            verdict = "Failed"
+            reason = f"{reason} Performance regression: {'; '.join(performance_violations)}."
+
+        test_case_report['analysis'] = {'verdict': verdict, 'reason': reason, 'performance_violations': performance_violations}
         test_case_report['status'] = verdict
         
-        # --- START OF FIX ---
-        # Construct the final report filename using the provided resolution name
-        resolution_tuple = test_case_report.get('resolution', (1920, 1080))
-        report_file_path = os.path.join("report", f"test_case_{test_case_id}_{resolution_name}_{resolution_tuple[0]}x{resolution_tuple[1]}_report.json")
-        # --- END OF FIX ---
-        
-        with open(report_file_path, "w") as report_file:
-            json.dump(test_case_report, report_file, indent=4)
+        # Appended to this run's report log by a background writer; no disk I/O here.
+        self.report_sink.submit(test_case_report)
         
         print(f"AnalyzerAgent: Verdict for Test Case {test_case_id} on {resolution_name} is '{verdict}'.")
         return test_case_report
\ No newline at end of file
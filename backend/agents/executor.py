@@ -8,12 +8,18 @@ from selenium.common.exceptions import StaleElementReferenceException, NoSuchEle
 import time
 from dotenv import load_dotenv
 from agents.solver import SolverAgent
+from agents.replay import SessionRecorder
+from agents.telemetry import PerformanceTelemetry
 
 # ... imports ...
 class ExecutorAgent:
-    def __init__(self, solver: SolverAgent, report_dir="report"):
+    def __init__(self, solver: SolverAgent, report_dir="report", recorder: SessionRecorder = None,
+                 telemetry: PerformanceTelemetry = None):
         self.report_dir = report_dir
         self.solver = solver
+        self.telemetry = telemetry or PerformanceTelemetry()
+        # When set, every session's boards, clicks and timings are written to a replayable trace.
+        self.recorder = recorder
 
     def _get_active_elements(self, driver, wait: WebDriverWait):
         try:
@@ -22,23 +28,34 @@ class ExecutorAgent:
         except Exception:
             return []
 
-    def execute_test_case(self, test_case: dict, resolution: tuple):
+    def execute_test_case(self, test_case: dict, resolution: tuple, resolution_name: str = None):
         test_case_id, objective = test_case['id'], test_case['test_objective']
         resolution_str = f"{resolution[0]}x{resolution[1]}"
+        resolution_name = resolution_name or resolution_str
         print(f"\nExecutorAgent: Starting session for TC {test_case_id} at {resolution_str}: {objective}")
         
         driver = None
+        telemetry_errors = []
         report_data = {
             "test_case_id": test_case_id, "status": "Failed", "objective": objective,
             "expected_results": test_case.get('expected_results'), "actual_log": "Test did not start.",
-            "actual_results": "", "artifacts": {"screenshots": []}, "resolution_name": resolution_str
+            "actual_results": "", "artifacts": {"screenshots": []}, "resolution_name": resolution_name
         }
+        session = {
+            "trace_id": f"{test_case_id}_{resolution_str}_{int(time.time() * 1000)}",
+            "test_case": test_case, "resolution": resolution_str, "resolution_name": resolution_name,
+            "board_before": [], "board_after_first_click": None, "board_after": None,
+            "action_plan": None, "clicked_indices": None, "error": None, "timings": {},
+        }
+        session_start = time.perf_counter()
 
         try:
             driver = webdriver.Chrome()
             driver.set_window_size(resolution[0], resolution[1])
             wait = WebDriverWait(driver, 20)
+            telemetry_errors = self.telemetry.start(driver)
             driver.get("https://play.ezygamers.com/")
+            self.telemetry.install(driver, telemetry_errors)
             wait.until(EC.element_to_be_clickable((By.XPATH, "//button[normalize-space()='English']"))).click()
             new_game_button = wait.until(EC.element_to_be_clickable((By.XPATH, "//button[normalize-space()='New Game']")))
             driver.execute_script("localStorage.setItem('sumLinkTutorialCompleted', 'true');")
@@ -46,12 +63,18 @@ class ExecutorAgent:
             
             active_elements_before = self._get_active_elements(driver, wait)
             board_state_before = [el.text for el in active_elements_before]
+            self.telemetry.mark_game_start(driver, telemetry_errors)
+            session["board_before"] = board_state_before
+            session["timings"]["setup_s"] = time.perf_counter() - session_start
             
             before_screenshot_path = os.path.join(self.report_dir, f"test_case_{test_case_id}_{resolution_str}_before.png")
             driver.save_screenshot(before_screenshot_path)
             report_data["artifacts"]["screenshots"].append(os.path.basename(before_screenshot_path))
             
+            solve_start = time.perf_counter()
             action_plan = self.solver.create_action_plan(active_elements_before, objective)
+            session["timings"]["solve_s"] = time.perf_counter() - solve_start
+            session["action_plan"] = action_plan
 
             if not action_plan.get("actionable", True):
                 report_data['status'] = "Passed"
@@ -63,31 +86,49 @@ class ExecutorAgent:
                     element2 = active_elements_before[indices_to_click[1]]
                     
                     print(f"[DEBUG] Clicking element 1: '{element1.text}' and element 2: '{element2.text}'")
+                    session["clicked_indices"] = list(indices_to_click)
+                    click_start = time.perf_counter()
                     element1.click()
                     time.sleep(0.5)
                     # We must re-find the second element in case the DOM changes
                     active_elements_after_first_click = self._get_active_elements(driver, wait)
+                    if self.recorder:
+                        # Read now: these elements can go stale once the pair clears.
+                        session["board_after_first_click"] = [el.text for el in active_elements_after_first_click]
                     # This is a simplification; a more robust solution would track element IDs
                     # For now, we assume the plan is still valid and click the second element
                     element2.click() 
                     
                     time.sleep(2)
                     board_state_after = [el.text for el in self._get_active_elements(driver, wait)]
+                    session["timings"]["clicks_s"] = time.perf_counter() - click_start
+                    session["board_after"] = board_state_after
                     report_data['status'] = "Pending Analysis"
                     report_data['actual_results'] = f"Board before: {board_state_before}. Board after: {board_state_after}."
+                    # Structured copy for the analyzer, which sends the boards in compact form.
+                    report_data['boards'] = {"before": board_state_before, "after": board_state_after}
                 else:
                     raise ValueError("Solver returned an invalid plan.")
 
         except Exception as e:
             error_message = f"Execution failed with error: {str(e)}"
             report_data['actual_log'] = error_message
+            session["error"] = error_message
         
         finally:
             if driver:
+                report_data["performance"] = self.telemetry.collect(driver, telemetry_errors)
                 final_screenshot_path = os.path.join(self.report_dir, f"test_case_{test_case_id}_{resolution_str}_final.png")
                 driver.save_screenshot(final_screenshot_path)
                 report_data["artifacts"]["screenshots"].append(os.path.basename(final_screenshot_path))
                 driver.quit()
+            if self.recorder:
+                session["timings"]["total_s"] = time.perf_counter() - session_start
+                session["screenshots"] = report_data["artifacts"]["screenshots"]
+                session["performance"] = report_data.get("performance")
+                self.recorder.record(session)
+                # Lets the analysis of this report be appended to the same trace later.
+                report_data["trace_id"] = session["trace_id"]
         
         return report_data
 
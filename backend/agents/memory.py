@@ -0,0 +1,282 @@
+import os
+from collections import defaultdict
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain.docstore.document import Document
+
+# Queries used to pull per-category context for the Planner. Each one is embedded
+# in the same batch, so adding a category costs one extra row, not one extra model call.
+OBJECTIVE_CATEGORY_QUERIES = {
+    "identical_pair": "Failures when removing a valid identical pair of numbers.",
+    "sum_to_ten": "Failures when removing a valid pair of numbers that sum to 10.",
+    "invalid_move": "Failures for invalid moves: pairs that are neither identical nor sum to 10.",
+    "edge_case": "Failures on edge cases: empty board, blocked cells, layout and resolution issues.",
+}
+
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+
+
+class FailureMemory:
+    """FAISS-backed store of past test failures.
+
+    Wraps the LangChain vector store so that many queries can be embedded in one
+    forward pass, searched in one index call, and filtered by metadata
+    (resolution, test_case_id, error_type). The underlying index can be swapped
+    from the exact flat index to IVF or HNSW once the memory grows large.
+    """
+
+    def __init__(self, embedding_model, path="faiss_memory_index", index_type="flat",
+                 ivf_nlist=100, ivf_nprobe=8, ivf_retrain_growth=2.0, hnsw_m=32, hnsw_ef_search=64):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index_type '{index_type}'. Expected one of {INDEX_TYPES}.")
+        self.embedding_model = embedding_model
+        self.path = path
+        self.index_type = index_type
+        self.ivf_nlist = ivf_nlist
+        self.ivf_nprobe = ivf_nprobe
+        # IVF keeps adding to its trained quantizer and only retrains once the memory has
+        # grown by this factor since the last training.
+        self.ivf_retrain_growth = ivf_retrain_growth
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_search = hnsw_ef_search
+
+        if os.path.exists(self.path):
+            print(f"FailureMemory: Loading existing memory from '{self.path}'...")
+            self.vector_store = FAISS.load_local(self.path, self.embedding_model, allow_dangerous_deserialization=True)
+        else:
+            print(f"FailureMemory: No memory found. Creating new vector store at '{self.path}'...")
+            # We need to create an index with at least one document
+            initial_text = "This is the beginning of the test agent's memory."
+            self.vector_store = FAISS.from_texts([initial_text], self.embedding_model)
+
+        # metadata key -> value -> index positions, so filters never scan the docstore.
+        self._metadata_ids = defaultdict(lambda: defaultdict(set))
+        self._index_metadata(self.vector_store.index_to_docstore_id.items())
+
+        # The saved index keeps whatever type it was built as; only rebuild when it differs
+        # from the requested one (in either direction), never on every startup.
+        if index_type_of(self.vector_store.index) != self.index_type:
+            self.rebuild_index()
+        else:
+            self._configure_search()
+            self._trained_size = len(self)
+
+    def __len__(self):
+        return self.vector_store.index.ntotal
+
+    # --- INDEX MANAGEMENT ---
+    def _stored_vectors(self):
+        index = self.vector_store.index
+        if isinstance(index, faiss.IndexIVF):
+            index.make_direct_map()
+        return index.reconstruct_n(0, index.ntotal).astype(np.float32)
+
+    def _configure_search(self):
+        index = self.vector_store.index
+        if isinstance(index, faiss.IndexIVF):
+            index.nprobe = min(self.ivf_nprobe, index.nlist)
+        elif isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efSearch = self.hnsw_ef_search
+
+    def rebuild_index(self, index_type=None):
+        """Rebuild the index from the stored vectors, keeping docstore ids aligned."""
+        index_type = index_type or self.index_type
+        vectors = self._stored_vectors()
+        self.vector_store.index = build_index(
+            vectors, index_type, nlist=self.ivf_nlist, nprobe=self.ivf_nprobe,
+            hnsw_m=self.hnsw_m, ef_search=self.hnsw_ef_search,
+        )
+        self.index_type = index_type
+        self._trained_size = len(vectors)
+        print(f"FailureMemory: Built '{self.vector_store.index.__class__.__name__}' over {len(vectors)} vectors.")
+
+    def add_documents(self, documents):
+        if not documents:
+            return
+        # Flat and HNSW indexes take new vectors incrementally; IVF adds to its existing
+        # lists and is only retrained once it has outgrown the data it was trained on.
+        first_new = len(self)
+        self.vector_store.add_documents(documents)
+        mapping = self.vector_store.index_to_docstore_id
+        self._index_metadata((idx, mapping[idx]) for idx in range(first_new, len(self)))
+        if self.index_type == "ivf" and len(self) >= self.ivf_retrain_growth * max(1, self._trained_size):
+            self.rebuild_index()
+
+    def save(self):
+        self.vector_store.save_local(self.path)
+
+    def learn_from_failures(self, reports):
+        """Embed every failed report into memory and persist the index. Returns the count learned."""
+        new_failures_to_learn = [failure_document(report) for report in reports if report.get('status') == 'Failed']
+        if new_failures_to_learn:
+            print(f"Found {len(new_failures_to_learn)} new failures. Embedding and adding to vector store...")
+            self.add_documents(new_failures_to_learn)
+            # Save the updated index to disk for the next run
+            self.save()
+            print("Memory updated successfully.")
+        else:
+            print("No new failures to learn from on this run.")
+        return len(new_failures_to_learn)
+
+    # --- RETRIEVAL ---
+    def embed_queries(self, queries):
+        """Embed all queries in a single batched call to the embedding model."""
+        return np.asarray(self.embedding_model.embed_documents(list(queries)), dtype=np.float32)
+
+    def _index_metadata(self, positions):
+        docstore = self.vector_store.docstore
+        for idx, doc_id in positions:
+            for key, value in docstore.search(doc_id).metadata.items():
+                # Only scalar metadata is filterable (screenshots lists are not).
+                if isinstance(value, (str, int, float, bool)) or value is None:
+                    self._metadata_ids[key][value].add(idx)
+
+    def search(self, vectors, k=4, metadata_filter=None):
+        """Search already-embedded query vectors; return one list of (Document, score) per row.
+
+        `metadata_filter` maps a metadata key to an accepted value, a list of accepted
+        values, or a callable predicate. Matching ids come from the metadata index and are
+        passed to FAISS as an IDSelector, so filtering happens inside the search. With the
+        flat index this returns up to `k` matching hits. IVF only visits `nprobe` lists and
+        HNSW only explores `efSearch` candidates, so a selective filter can return fewer
+        than `k` hits with those indexes; raise nprobe/efSearch if that matters.
+        """
+        params = selector = None
+        if metadata_filter:
+            allowed_ids = np.asarray(sorted(self._matching_ids(metadata_filter)), dtype=np.int64)
+            if not len(allowed_ids):
+                return [[] for _ in vectors]
+            # The selector must stay referenced until the search has run.
+            selector = faiss.IDSelectorBatch(len(allowed_ids), faiss.swig_ptr(allowed_ids))
+            params = search_params(self.vector_store.index, selector)
+
+        scores, ids = self.vector_store.index.search(vectors, min(k, len(self)), params=params)
+
+        results = []
+        for row_scores, row_ids in zip(scores, ids):
+            hits = []
+            for score, idx in zip(row_scores, row_ids):
+                if idx == -1:
+                    continue
+                doc = self.vector_store.docstore.search(self.vector_store.index_to_docstore_id[idx])
+                hits.append((doc, float(score)))
+            results.append(hits)
+        return results
+
+    def retrieve(self, queries, k=4, metadata_filter=None):
+        """Embed `queries` in one batch and search them; see `search` for filtering."""
+        if not queries:
+            return []
+        return self.search(self.embed_queries(queries), k=k, metadata_filter=metadata_filter)
+
+    def _matching_ids(self, metadata_filter):
+        matching = None
+        for key, accepted in metadata_filter.items():
+            by_value = self._metadata_ids.get(key, {})
+            if callable(accepted):
+                values = [value for value in by_value if accepted(value)]
+            elif isinstance(accepted, (list, tuple, set)):
+                values = accepted
+            else:
+                values = [accepted]
+            ids = set().union(*(by_value.get(value, ()) for value in values))
+            matching = ids if matching is None else matching & ids
+            if not matching:
+                return set()
+        return matching
+
+    def retrieve_ranked(self, queries, k=4, metadata_filters=None):
+        """Retrieve for many queries at once; return unique (Document, score) pairs, best first.
+
+        Queries are embedded once, then searched once per entry of `metadata_filters`
+        (a single unfiltered search if none are given). A document hit by several queries
+        or filters keeps its best (lowest L2 distance) score, so the ranking reflects
+        similarity rather than which query found it.
+        """
+        if not queries:
+            return []
+        vectors = self.embed_queries(queries)
+        best = {}
+        for metadata_filter in metadata_filters or [None]:
+            for hits in self.search(vectors, k=k, metadata_filter=metadata_filter):
+                for doc, score in hits:
+                    if doc.page_content not in best or score < best[doc.page_content][1]:
+                        best[doc.page_content] = (doc, score)
+        return sorted(best.values(), key=lambda hit: hit[1])
+
+
+def classify_error(report):
+    # Coarse error type stored as metadata so retrieval can filter on it.
+    # Performance violations are checked first: a run with no board change (e.g. the
+    # solver found no move) can still have failed on responsiveness alone.
+    if (report.get('analysis') or {}).get('performance_violations'):
+        return "performance_regression"
+    log = report.get('actual_log') or ""
+    if log.startswith("Execution failed"):
+        return "execution_error"
+    if not report.get('actual_results'):
+        return "no_result"
+    return "assertion_failed"
+
+
+def failure_document(report):
+    # Create a detailed text document for the failure
+    analysis = report.get('analysis') or {}
+    failure_content = (
+        f"Failure Report for Test Case ID {report['test_case_id']} on {report['resolution_name']}:\n"
+        f"Objective: {report['objective']}\n"
+        f"Expected Results: {report['expected_results']}\n"
+        f"Actual Log: {report['actual_log']}\n"
+        f"Actual Results: {report['actual_results']}\n"
+        f"Analysis: {analysis.get('reason', 'No analysis recorded.')}\n"
+    )
+    if analysis.get('performance_violations'):
+        failure_content += f"Performance Violations: {'; '.join(analysis['performance_violations'])}\n"
+    # Create metadata linking the text to the screenshot evidence
+    failure_metadata = {
+        "test_case_id": report['test_case_id'],
+        "resolution": report['resolution_name'],
+        "error_type": classify_error(report),
+        "screenshots": report['artifacts']['screenshots']
+    }
+    return Document(page_content=failure_content, metadata=failure_metadata)
+
+
+def search_params(index, selector):
+    """FAISS search parameters restricting `index` to the ids accepted by `selector`."""
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+def index_type_of(index):
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def build_index(vectors, index_type, nlist=100, nprobe=8, hnsw_m=32, ef_search=64):
+    """Build a FAISS L2 index of the given type over `vectors` (float32, shape [n, d])."""
+    n, dim = vectors.shape
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == "ivf":
+        # IVF needs at least one training point per list; small memories get fewer lists.
+        nlist = max(1, min(nlist, n))
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_L2)
+        index.train(vectors)
+        index.nprobe = min(nprobe, nlist)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efSearch = ef_search
+    else:
+        raise ValueError(f"Unknown index_type '{index_type}'. Expected one of {INDEX_TYPES}.")
+    if n:
+        index.add(vectors)
+    return index
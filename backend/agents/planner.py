@@ -4,13 +4,14 @@ import google.generativeai as genai
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
+from agents.prompt_budget import TokenBudget, TokenUsageLog, join_sections
 
 load_dotenv()
 
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
 
 class PlannerAgent:
-    def __init__(self):
+    def __init__(self, context_token_budget=2000):
         genai.configure(api_key=GOOGLE_API_KEY)
         self.llm = ChatGoogleGenerativeAI(model="gemini-1.5-pro-latest", temperature=0.8, google_api_key=GOOGLE_API_KEY)
         
@@ -38,12 +39,25 @@ class PlannerAgent:
             input_variables=["human_guidance", "context"],
             partial_variables={"format_instructions": JsonOutputParser().get_format_instructions()}
         )
-        self.chain = self.prompt | self.llm | JsonOutputParser()
-
-    def generate_test_cases(self, context: str, human_guidance: str):
+        # The parser runs separately so the LLM message's usage_metadata can be recorded.
+        self.chain = self.prompt | self.llm
+        self.parser = JsonOutputParser()
+        # Human guidance is filled first; retrieved failures get whatever budget is left.
+        # When context is a best-first list of failures, the least similar ones are dropped.
+        self.context_budget = TokenBudget(context_token_budget)
+        self.token_usage = TokenUsageLog("PlannerAgent")
+
+    def generate_test_cases(self, context, human_guidance: str):
         print("PlannerAgent: Generating objectives using human guidance and past context...")
         try:
-            test_cases_raw = self.chain.invoke({"context": context, "human_guidance": human_guidance})
+            raw_inputs = {"context": join_sections(context), "human_guidance": human_guidance}
+            inputs = self.context_budget.fit([
+                ("human_guidance", human_guidance, 0),
+                ("context", context, 1),
+            ])
+            message = self.chain.invoke(inputs)
+            self.token_usage.record("generate_test_cases", self.prompt, raw_inputs, inputs, message)
+            test_cases_raw = self.parser.invoke(message)
             test_cases = [{'id': 200 + i, **{k.lower().replace(" ", "_"): v for k, v in case.items()}} for i, case in enumerate(test_cases_raw)]
             print(f"PlannerAgent: Generated {len(test_cases)} AI-driven objectives.")
             return test_cases
@@ -0,0 +1,140 @@
+import math
+import time
+from collections import deque
+
+# Rough chars-per-token ratio for Gemini/SentencePiece on English and digits. Only used to
+# budget prompts before they are sent; the real counts come back in each response's
+# usage_metadata and are what TokenUsageLog reports.
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = "...[truncated]"
+
+
+def estimate_tokens(text):
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def encode_board(values):
+    """Compact board encoding: each value followed by the indices where it appears.
+
+    Consecutive indices are collapsed into runs, e.g. ['8', '1', '8', '8', '2'] becomes
+    "8:0,2-3 1:1 2:4". Values keep the order in which they first appear on the board.
+    """
+    positions = {}
+    for index, value in enumerate(values):
+        positions.setdefault(str(value).strip(), []).append(index)
+    return " ".join(f"{value}:{_index_runs(indices)}" for value, indices in positions.items())
+
+
+def _index_runs(indices):
+    runs, start, prev = [], indices[0], indices[0]
+    for index in indices[1:]:
+        if index == prev + 1:
+            prev = index
+            continue
+        runs.append(f"{start}-{prev}" if prev != start else f"{start}")
+        start = prev = index
+    runs.append(f"{start}-{prev}" if prev != start else f"{start}")
+    return ",".join(runs)
+
+
+def truncate_to_tokens(text, max_tokens, separator="\n\n"):
+    """Cut `text` down to `max_tokens`, dropping whole trailing chunks before cutting characters."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    kept = []
+    for chunk in text.split(separator):
+        candidate = separator.join(kept + [chunk])
+        if estimate_tokens(candidate + separator + TRUNCATION_MARKER) > max_tokens:
+            break
+        kept.append(chunk)
+    if kept:
+        return separator.join(kept) + separator + TRUNCATION_MARKER
+    max_chars = max_tokens * CHARS_PER_TOKEN - len(TRUNCATION_MARKER)
+    if max_chars <= 0:
+        # Too small a budget to even hold the marker.
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    return text[:max_chars] + TRUNCATION_MARKER
+
+
+class TokenBudget:
+    """Fits named prompt sections into a shared token budget.
+
+    Sections are (name, text, priority) tuples; a lower priority number is more
+    important. Sections are filled in priority order, so low-priority context is cut
+    before guidance. A section given as a list of chunks is treated as ranked best
+    first: whole chunks are kept in rank order while they fit, and the rest are dropped.
+    """
+
+    def __init__(self, max_tokens):
+        self.max_tokens = max_tokens
+
+    def fit(self, sections):
+        remaining = self.max_tokens
+        fitted = {}
+        for name, text, _ in sorted(sections, key=lambda section: section[2]):
+            if isinstance(text, (list, tuple)):
+                fitted[name] = self._fit_ranked(text, remaining)
+            else:
+                fitted[name] = truncate_to_tokens(text, remaining)
+            remaining -= estimate_tokens(fitted[name])
+        return fitted
+
+    @staticmethod
+    def _fit_ranked(chunks, max_tokens, separator="\n\n"):
+        kept = []
+        for chunk in chunks:
+            if estimate_tokens(separator.join(kept + [chunk])) <= max_tokens:
+                kept.append(chunk)
+        return separator.join(kept)
+
+
+def join_sections(text, separator="\n\n"):
+    """The untruncated form of a section that may be given as ranked chunks."""
+    return separator.join(text) if isinstance(text, (list, tuple)) else text
+
+
+class TokenUsageLog:
+    """Per-call token accounting.
+
+    Real input/output tokens are read from the LLM message's usage_metadata. Estimated
+    prompt sizes with and without compaction are kept alongside to measure savings.
+    Only the most recent `max_calls` entries are kept; totals cover every call.
+    """
+
+    def __init__(self, agent_name, max_calls=200):
+        self.agent_name = agent_name
+        self.calls = deque(maxlen=max_calls)
+        self.totals = {
+            "calls": 0, "input_tokens": 0, "output_tokens": 0,
+            "estimated_raw_prompt_tokens": 0, "estimated_prompt_tokens": 0,
+        }
+
+    def record(self, call, prompt, raw_inputs, compact_inputs, message=None):
+        raw_tokens = estimate_tokens(prompt.format(**raw_inputs))
+        prompt_tokens = estimate_tokens(prompt.format(**compact_inputs))
+        usage = getattr(message, "usage_metadata", None) or {}
+        entry = {
+            "agent": self.agent_name, "call": call, "timestamp": time.time(),
+            "input_tokens": usage.get("input_tokens"), "output_tokens": usage.get("output_tokens"),
+            "estimated_raw_prompt_tokens": raw_tokens, "estimated_prompt_tokens": prompt_tokens,
+            "estimated_saved_tokens": raw_tokens - prompt_tokens,
+        }
+        self.calls.append(entry)
+        self.totals["calls"] += 1
+        self.totals["input_tokens"] += entry["input_tokens"] or 0
+        self.totals["output_tokens"] += entry["output_tokens"] or 0
+        self.totals["estimated_raw_prompt_tokens"] += raw_tokens
+        self.totals["estimated_prompt_tokens"] += prompt_tokens
+        print(f"{self.agent_name}: {entry['input_tokens']} input / {entry['output_tokens']} output tokens "
+              f"(prompt compaction saved ~{entry['estimated_saved_tokens']}).")
+        return entry
+
+    def summary(self):
+        return {
+            "agent": self.agent_name, **self.totals,
+            "estimated_saved_tokens": self.totals["estimated_raw_prompt_tokens"] - self.totals["estimated_prompt_tokens"],
+        }
@@ -0,0 +1,215 @@
+import glob
+import json
+import os
+import time
+import zlib
+from collections import namedtuple
+
+# Stand-in for a Selenium WebElement: the solver only reads `.text`.
+ReplayElement = namedtuple("ReplayElement", ["text"])
+
+TRACE_VERSION = 2
+
+
+class SessionRecorder:
+    """Appends one compact JSON line per executor session to a gzipped trace file.
+
+    Each run gets its own `run_<timestamp>.jsonl.gz`. Every record is written as its
+    own gzip member, so a crash mid-run can only damage the last member and every
+    completed session stays readable. The analyzer's verdict is appended later as a
+    separate "analysis" record keyed by the session's trace_id.
+    """
+
+    def __init__(self, trace_dir="traces"):
+        self.trace_dir = trace_dir
+        os.makedirs(self.trace_dir, exist_ok=True)
+        self.trace_path = os.path.join(self.trace_dir, f"run_{time.strftime('%Y%m%d_%H%M%S')}.jsonl.gz")
+
+    def _append(self, record):
+        # A fresh compressor per record writes one complete gzip member per line.
+        compressor = zlib.compressobj(wbits=31)
+        member = compressor.compress((json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8"))
+        with open(self.trace_path, "ab") as trace_file:
+            trace_file.write(member + compressor.flush())
+
+    def record(self, session):
+        self._append({"type": "session", "version": TRACE_VERSION, **session})
+
+    def record_analysis(self, report):
+        if not report.get("trace_id"):
+            return
+        analysis = report.get("analysis") or {}
+        self._append({
+            "type": "analysis", "trace_id": report["trace_id"], "status": report.get("status"),
+            "verdict": analysis.get("verdict"), "reason": analysis.get("reason"),
+        })
+
+
+def _read_trace_lines(trace_path):
+    """Return (lines, error) from every complete gzip member; error describes a damaged tail."""
+    with open(trace_path, "rb") as trace_file:
+        raw = trace_file.read()
+    lines = []
+    while raw:
+        decompressor = zlib.decompressobj(wbits=31)
+        try:
+            data = decompressor.decompress(raw)
+        except zlib.error as e:
+            return lines, f"corrupt gzip data: {e}"
+        if not decompressor.eof:
+            return lines, "truncated gzip member"
+        lines.extend(data.decode("utf-8").splitlines())
+        raw = decompressor.unused_data
+    return lines, None
+
+
+def load_traces(paths, damaged=None):
+    """Yield recorded sessions from trace files, or from every trace file in a directory.
+
+    Each session carries the recorded analyzer verdict under "recorded_analysis" when one
+    was written. Torn or corrupt data is skipped; if `damaged` is a list, a description of
+    every skipped part is appended to it.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, "*.jsonl.gz"))) if os.path.isdir(path) else [path]
+        for trace_path in files:
+            try:
+                lines, error = _read_trace_lines(trace_path)
+            except OSError as e:
+                lines, error = [], str(e)
+            if error and damaged is not None:
+                damaged.append({"trace_file": trace_path, "error": error})
+
+            sessions, analyses = [], {}
+            for line_number, line in enumerate(lines, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    if damaged is not None:
+                        damaged.append({"trace_file": trace_path, "line": line_number, "error": str(e)})
+                    continue
+                if record.get("type") == "analysis":
+                    analyses[record["trace_id"]] = record
+                else:
+                    sessions.append(record)
+            for session in sessions:
+                session["recorded_analysis"] = analyses.get(session.get("trace_id"))
+                yield session
+
+
+def is_valid_pair(first, second):
+    # Game Rules: a valid pair is two numbers that are either IDENTICAL or sum to 10.
+    try:
+        return first == second or int(first) + int(second) == 10
+    except ValueError:
+        return False
+
+
+def apply_move(board, indices):
+    """Simulate a pair click on a board snapshot. Invalid pairs leave the board unchanged.
+
+    Only the pairing rule is modelled, not the game's adjacency rules, so replays reuse
+    the recorded board whenever the solver picks the same pair as the recording.
+    """
+    i, j = indices
+    if i == j or not (0 <= i < len(board) and 0 <= j < len(board)) or not is_valid_pair(board[i], board[j]):
+        return list(board)
+    return [value for k, value in enumerate(board) if k not in (i, j)]
+
+
+class ReplayEngine:
+    """Feeds recorded executor sessions back through the solver, analyzer and memory stages.
+
+    No browser is started: the recorded board snapshot stands in for the live grid and
+    the recorded (or simulated) post-click board stands in for the game's response.
+    """
+
+    def __init__(self, solver, analyzer, memory=None):
+        self.solver = solver
+        self.analyzer = analyzer
+        self.memory = memory
+
+    def replay_session(self, session):
+        test_case = session["test_case"]
+        board_before = session["board_before"]
+        report_data = {
+            "test_case_id": test_case["id"], "status": "Failed", "objective": test_case["test_objective"],
+            "expected_results": test_case.get("expected_results"), "actual_log": "Test did not start.",
+            "actual_results": "", "artifacts": {"screenshots": list(session.get("screenshots", []))},
+            "resolution_name": session.get("resolution_name", session["resolution"]), "replayed_from": session.get("trace_id"),
+        }
+        if session.get("performance"):
+            # Recorded browser telemetry is replayed so threshold changes can be regression-tested too.
+            report_data["performance"] = session["performance"]
+
+        if session.get("error") and not board_before:
+            # The live session never reached a stable board; replay the recorded failure as-is.
+            report_data['actual_log'] = session["error"]
+            return self.analyzer.analyze_test_case(report_data), False
+
+        start = time.perf_counter()
+        try:
+            elements = [ReplayElement(text=value) for value in board_before]
+            action_plan = self.solver.create_action_plan(elements, test_case["test_objective"])
+            recorded_indices = session.get("clicked_indices")
+
+            if not action_plan.get("actionable", True):
+                diverged = recorded_indices is not None
+                report_data['status'] = "Passed"
+                report_data['actual_log'] = f"Solver correctly determined no valid move existed. Board: {board_before}"
+            else:
+                indices_to_click = action_plan.get("indices_to_click", [])
+                if len(indices_to_click) != 2:
+                    raise ValueError("Solver returned an invalid plan.")
+                diverged = list(indices_to_click) != recorded_indices
+                if not diverged and session.get("error"):
+                    # Same clicks as the live session, which failed after clicking: replay that failure.
+                    report_data['actual_log'] = session["error"]
+                else:
+                    board_after = apply_move(board_before, indices_to_click) if diverged else session["board_after"]
+                    report_data['status'] = "Pending Analysis"
+                    report_data['actual_results'] = f"Board before: {board_before}. Board after: {board_after}."
+                    report_data['boards'] = {"before": board_before, "after": board_after}
+        except Exception as e:
+            diverged = True
+            report_data['actual_log'] = f"Execution failed with error: {str(e)}"
+
+        report_data['replay_timings'] = {"solve_s": time.perf_counter() - start}
+        return self.analyzer.analyze_test_case(report_data), diverged
+
+    def replay(self, trace_paths, learn=False):
+        """Replay every recorded session and summarise how the agents' behaviour changed."""
+        results, diverged_ids, verdict_changes, damaged = [], [], [], []
+        start = time.perf_counter()
+        for session in load_traces(trace_paths, damaged=damaged):
+            report, diverged = self.replay_session(session)
+            results.append(report)
+            if diverged:
+                diverged_ids.append(session.get("trace_id"))
+            recorded = session.get("recorded_analysis")
+            if recorded and recorded.get("verdict") != report.get("status"):
+                verdict_changes.append({
+                    "trace_id": session.get("trace_id"), "recorded": recorded.get("verdict"),
+                    "replayed": report.get("status"), "plan_diverged": diverged,
+                })
+
+        if learn and self.memory is not None:
+            self.memory.learn_from_failures(results)
+
+        summary = {
+            "sessions": len(results),
+            "passed": sum(1 for r in results if r.get('status') == 'Passed'),
+            "failed": sum(1 for r in results if r.get('status') == 'Failed'),
+            "diverged_from_recording": diverged_ids,
+            "verdict_changes": verdict_changes,
+            "damaged": damaged,
+            "elapsed_s": time.perf_counter() - start,
+        }
+        print(f"ReplayEngine: Replayed {summary['sessions']} sessions in {summary['elapsed_s']:.2f}s "
+              f"({summary['passed']} passed, {summary['failed']} failed, {len(diverged_ids)} diverged, "
+              f"{len(verdict_changes)} verdict changes, {len(damaged)} damaged trace parts skipped).")
+        return {"summary": summary, "results": results}
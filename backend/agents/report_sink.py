@@ -0,0 +1,242 @@
+import atexit
+import glob
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+
+# Queue sentinels: _FLUSH writes the pending batch right away, _STOP also ends the writer.
+_FLUSH = object()
+_STOP = object()
+
+# Run id given to reports migrated from the per-test JSON files written before the logs.
+LEGACY_RUN_ID = "00000000_legacy"
+
+
+class ReportSink:
+    """Background, append-only writer for analyzed test reports.
+
+    `submit` only serializes the report and puts it on a queue; a writer thread appends
+    batches of compact JSON lines to `<report_dir>/runs/run_<run_id>.jsonl` and fsyncs
+    after each batch. Every run keeps its own log, so nothing is overwritten, and a crash
+    can at worst leave one torn trailing line, which readers skip. Per-test JSON views are
+    built on demand and written with an atomic rename.
+
+    Reads never rescan the logs per request, and reports are not cached in memory: only
+    the byte offset of each report is kept per test case. Earlier runs' logs are indexed
+    once, on the first read; this run's reports are indexed as the writer appends them,
+    and are served from the queue until then. Replayed reports (those with
+    `replayed_from`) are logged but kept out of the per-test views.
+    """
+
+    def __init__(self, report_dir="report", run_id=None, batch_size=50, flush_interval=1.0):
+        self.report_dir = report_dir
+        self.runs_dir = os.path.join(report_dir, "runs")
+        os.makedirs(self.runs_dir, exist_ok=True)
+        # pid + random suffix: two sinks started within the same second (e.g. a --reload
+        # restart) must never share a log file.
+        self.run_id = run_id or f"{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{uuid.uuid4().hex[:6]}"
+        self.log_path = os.path.join(self.runs_dir, f"run_{self.run_id}.jsonl")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue()
+        self._closed = False
+        # test_case_id -> [(log_path, offset)] for earlier runs (built lazily), offsets into
+        # this run's log, and this run's lines that are still waiting for the writer.
+        self._lock = threading.Lock()
+        self._past_offsets = None
+        self._own_offsets = defaultdict(list)
+        self._pending_lines = defaultdict(deque)
+        self._writer = threading.Thread(target=self._run, name="ReportSinkWriter", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # --- HOT PATH ---
+    def submit(self, report):
+        """Queue a report for writing and return immediately."""
+        if self._closed:
+            raise RuntimeError("ReportSink is closed.")
+        record = {"run_id": self.run_id, "recorded_at": time.time(), **report}
+        # Serialize now so later mutation of the report cannot change what gets written.
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        # Replayed reports are written but never indexed (key None).
+        key = None if record.get("replayed_from") else record.get("test_case_id")
+        if key is not None:
+            with self._lock:
+                self._pending_lines[key].append(line)
+        self._queue.put((key, line))
+
+    def flush(self):
+        """Block until every report submitted so far is on disk."""
+        if not self._closed:
+            self._queue.put(_FLUSH)
+            self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._queue.put(_STOP)
+        self._closed = True
+        self._writer.join()
+
+    # --- WRITER THREAD ---
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not _FLUSH and batch[-1] is not _STOP:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            entries = [item for item in batch if isinstance(item, tuple)]
+            if entries:
+                self._write(entries)
+            for _ in batch:
+                self._queue.task_done()
+            if batch[-1] is _STOP:
+                return
+
+    def _write(self, entries):
+        encoded = [(key, line.encode("utf-8")) for key, line in entries]
+        offsets = None
+        try:
+            with open(self.log_path, "ab") as log_file:
+                offset = log_file.tell()
+                log_file.write(b"".join(data for _, data in encoded))
+                log_file.flush()
+                os.fsync(log_file.fileno())
+            offsets = []
+            for key, data in encoded:
+                offsets.append((key, offset))
+                offset += len(data)
+        except Exception as e:
+            print(f"ReportSink: Failed to write {len(entries)} reports to '{self.log_path}': {e}")
+
+        with self._lock:
+            for key, _ in entries:
+                if key is None:
+                    continue
+                self._pending_lines[key].popleft()
+                if not self._pending_lines[key]:
+                    del self._pending_lines[key]
+            for key, offset in offsets or []:
+                if key is not None:
+                    self._own_offsets[key].append(offset)
+
+    # --- READ SIDE ---
+    def _index_past_logs(self):
+        """Offsets of every indexable report in earlier runs' logs; torn lines are skipped."""
+        self._migrate_legacy_reports()
+        past = defaultdict(list)
+        for log_path in sorted(glob.glob(os.path.join(self.runs_dir, "run_*.jsonl"))):
+            if log_path == self.log_path:
+                continue
+            with open(log_path, "rb") as log_file:
+                offset = 0
+                for line in log_file:
+                    try:
+                        report = json.loads(line)
+                    except json.JSONDecodeError:
+                        report = {}
+                    if report and not report.get("replayed_from"):
+                        past[report.get("test_case_id")].append((log_path, offset))
+                    offset += len(line)
+        return past
+
+    def _migrate_legacy_reports(self):
+        """Copy pre-log `test_case_*_report.json` files into a log once, so their history is served too.
+
+        The log sorts before every timestamped run, so legacy reports are always the oldest.
+        """
+        legacy_log = os.path.join(self.runs_dir, f"run_{LEGACY_RUN_ID}.jsonl")
+        legacy_paths = glob.glob(os.path.join(self.report_dir, "test_case_*_report.json"))
+        if not legacy_paths or os.path.exists(legacy_log):
+            return
+        lines = []
+        for legacy_path in sorted(legacy_paths, key=os.path.getmtime):
+            try:
+                with open(legacy_path, "r", encoding="utf-8") as legacy_file:
+                    report = json.load(legacy_file)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"ReportSink: Skipping unreadable legacy report '{legacy_path}': {e}")
+                continue
+            record = {"run_id": LEGACY_RUN_ID, "recorded_at": os.path.getmtime(legacy_path), **report}
+            lines.append(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+        _atomic_write(legacy_log, "".join(lines), self.runs_dir)
+        print(f"ReportSink: Migrated {len(lines)} legacy reports into '{legacy_log}'.")
+
+    def load_reports(self, test_case_id, resolution_name=None, run_id=None):
+        """Reports for one test case, oldest first, optionally filtered."""
+        with self._lock:
+            if self._past_offsets is None:
+                self._past_offsets = self._index_past_logs()
+            locations = list(self._past_offsets.get(test_case_id, []))
+            locations += [(self.log_path, offset) for offset in self._own_offsets.get(test_case_id, [])]
+            pending = list(self._pending_lines.get(test_case_id, []))
+
+        reports = []
+        open_files = {}
+        try:
+            for log_path, offset in locations:
+                if log_path not in open_files:
+                    open_files[log_path] = open(log_path, "rb")
+                log_file = open_files[log_path]
+                log_file.seek(offset)
+                reports.append(json.loads(log_file.readline()))
+        finally:
+            for log_file in open_files.values():
+                log_file.close()
+        reports += [json.loads(line) for line in pending]
+        return [
+            report for report in reports
+            if (resolution_name is None or report.get("resolution_name") == resolution_name)
+            and (run_id is None or report.get("run_id") == run_id)
+        ]
+
+    def build_view(self, test_case_id, resolution_name=None, run_id=None):
+        """Per-test view: the most recent report, the latest per resolution, and the full history."""
+        history = self.load_reports(test_case_id, resolution_name, run_id)
+        latest_by_resolution = {}
+        for report in history:
+            latest_by_resolution[report.get("resolution_name")] = report
+        return {"test_case_id": test_case_id, "runs": len({r["run_id"] for r in history}),
+                "report": history[-1] if history else None,
+                "latest_by_resolution": latest_by_resolution, "history": history}
+
+    def write_view(self, test_case_id, resolution_name=None, run_id=None):
+        """Materialize a per-test JSON view next to the screenshots, replacing it atomically.
+
+        Returns (None, view) without writing anything if no report matches.
+        """
+        view = self.build_view(test_case_id, resolution_name, run_id)
+        if not view["history"]:
+            return None, view
+        suffix = (f"_{resolution_name}" if resolution_name else "") + (f"_run_{run_id}" if run_id else "")
+        view_path = os.path.join(self.report_dir, f"test_case_{test_case_id}{suffix}_view.json")
+        _atomic_write(view_path, json.dumps(view, indent=4), self.report_dir)
+        return view_path, view
+
+
+def _atomic_write(path, text, directory):
+    # A unique temp file per call, so concurrent writers of the same path never share one.
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+            tmp_file.write(text)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -4,6 +4,7 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 import os
+from agents.prompt_budget import encode_board, TokenUsageLog
 
 load_dotenv()
 
@@ -17,22 +18,22 @@ class SolverAgent:
         self.prompt = PromptTemplate(
             template="""
             You are an expert game player. Your task is to find a valid pair to click based on a list of available numbers and a test objective.
-            The input is a list of dictionaries, where each dictionary has a 'text' (the number) and an 'index' (its position on the board).
+            The board is encoded as space-separated "value:indices" entries. Each entry lists every board index holding that value; "a-b" is the run of indices a through b.
             Game Rules: A valid pair is two numbers that are either IDENTICAL or sum to 10.
 
             Your Task:
             Analyze the list of available numbers and the objective. Find the best pair that satisfies the objective.
-            Return a JSON object with the key "indices_to_click", which is a list containing the two integer indices of the elements you chose from the original list.
+            Return a JSON object with the key "indices_to_click", which is a list containing the two integer board indices you chose.
             If no valid move exists that satisfies the objective, return a JSON object with the key "actionable" set to false.
 
-            Available Numbers (List of Dictionaries):
+            Available Numbers (value:indices):
             {elements_info}
 
             Test Objective:
             {test_objective}
 
             Example:
-            Available Numbers: [{{"text": "8", "index": 0}}, {{"text": "1", "index": 1}}, {{"text": "9", "index": 2}}, {{"text": "8", "index": 3}}]
+            Available Numbers: 8:0,3 1:1 9:2
             Objective: "Verify removal of an identical pair."
             Output: {{"indices_to_click": [0, 3]}}
             \n{format_instructions}\n
@@ -40,19 +41,25 @@ class SolverAgent:
             input_variables=["elements_info", "test_objective"],
             partial_variables={"format_instructions": JsonOutputParser().get_format_instructions()}
         )
-        self.chain = self.prompt | self.llm | JsonOutputParser()
+        # The parser runs separately so the LLM message's usage_metadata can be recorded.
+        self.chain = self.prompt | self.llm
+        self.parser = JsonOutputParser()
+        self.token_usage = TokenUsageLog("SolverAgent")
 
     def create_action_plan(self, active_elements, test_objective):
         if not active_elements:
             return {"actionable": False, "reason": "The board is empty."}
         
-        # Create a simplified list for the LLM
-        elements_info = [{"text": el.text, "index": i} for i, el in enumerate(active_elements)]
+        # Compact value->indices encoding for the LLM instead of a repr'd list of dicts
+        board_values = [el.text for el in active_elements]
+        elements_info = encode_board(board_values)
         print(f"SolverAgent: Finding a move for '{test_objective}' from available elements: {elements_info}")
-        
-        plan = self.chain.invoke({
-            "elements_info": str(elements_info),
-            "test_objective": test_objective
-        })
+
+        inputs = {"elements_info": elements_info, "test_objective": test_objective}
+        raw_elements_info = str([{"text": value, "index": i} for i, value in enumerate(board_values)])
+        message = self.chain.invoke(inputs)
+        self.token_usage.record("create_action_plan", self.prompt,
+                                {**inputs, "elements_info": raw_elements_info}, inputs, message)
+        plan = self.parser.invoke(message)
         print(f"SolverAgent: Generated plan: {plan}")
         return plan
\ No newline at end of file
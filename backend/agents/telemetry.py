@@ -0,0 +1,182 @@
+# Browser-side performance telemetry for the game under test. Works with any Selenium
+# driver through execute_script; Chromium drivers additionally report DevTools
+# Performance domain metrics through execute_cdp_cmd.
+
+# On Chromium this is registered with Page.addScriptToEvaluateOnNewDocument before the
+# first navigation, so it survives any later navigation; other drivers get it through
+# execute_script after load. It is wrapped in a function so it is valid in both places.
+# Long tasks use a buffered observer; clicks are timed from the event timestamp to the
+# first DOM mutation and to the next animation frame after it.
+_INSTRUMENT_SCRIPT = """
+(function () {
+const T = window.__gameTelemetry = window.__gameTelemetry || {clicks: [], longTasks: [], installed: false, gameStartMs: null};
+if (T.installed) { return; }
+T.installed = true;
+try {
+    new PerformanceObserver((list) => {
+        for (const e of list.getEntries()) { T.longTasks.push({start_ms: e.startTime, duration_ms: e.duration}); }
+    }).observe({type: 'longtask', buffered: true});
+} catch (e) {}
+document.addEventListener('click', (ev) => {
+    const t0 = ev.timeStamp;
+    const rec = {start_ms: t0, target: String(ev.target && ev.target.className || ''), dom_update_ms: null, next_frame_ms: null};
+    T.clicks.push(rec);
+    const obs = new MutationObserver(() => {
+        obs.disconnect();
+        rec.dom_update_ms = performance.now() - t0;
+        requestAnimationFrame(() => { rec.next_frame_ms = performance.now() - t0; });
+    });
+    obs.observe(document.body, {subtree: true, childList: true, attributes: true, characterData: true});
+    setTimeout(() => obs.disconnect(), 5000);
+}, true);
+})();
+"""
+
+_MARK_GAME_START_SCRIPT = """
+if (window.__gameTelemetry) { window.__gameTelemetry.gameStartMs = performance.now(); }
+"""
+
+_COLLECT_SCRIPT = """
+const T = window.__gameTelemetry || {clicks: [], longTasks: [], gameStartMs: null};
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+const slowest = resources.slice().sort((a, b) => b.duration - a.duration).slice(0, 5);
+return {
+    navigation: nav ? {
+        ttfb_ms: nav.responseStart - nav.requestStart,
+        dom_content_loaded_ms: nav.domContentLoadedEventEnd,
+        load_event_ms: nav.loadEventEnd,
+        transfer_bytes: nav.transferSize,
+    } : null,
+    resources: {
+        count: resources.length,
+        transfer_bytes: resources.reduce((sum, r) => sum + (r.transferSize || 0), 0),
+        slowest: slowest.map((r) => ({name: r.name, duration_ms: r.duration})),
+    },
+    long_tasks: T.longTasks,
+    game_start_ms: T.gameStartMs,
+    clicks: T.clicks,
+    js_heap: performance.memory ? {
+        used_bytes: performance.memory.usedJSHeapSize,
+        total_bytes: performance.memory.totalJSHeapSize,
+    } : null,
+};
+"""
+
+# Limits AnalyzerAgent turns into performance-regression failures. The defaults only
+# cover the game's response to interaction: long-task metrics count tasks after the
+# game started, not page load. A missing metric is never a violation, so non-Chromium
+# drivers only get the checks they can support.
+DEFAULT_PERFORMANCE_THRESHOLDS = {
+    "max_click_to_dom_ms": 300,
+    "max_long_task_ms": 200,
+    "total_blocking_time_ms": 500,
+}
+
+# Page-load and memory limits against the remote site are dominated by network and
+# cold-start noise, so they are opt-in: merge them into `performance_thresholds`.
+PAGE_LOAD_THRESHOLDS = {
+    "dom_content_loaded_ms": 3000,
+    "load_event_ms": 5000,
+    "js_heap_used_mb": 100,
+}
+
+# Main-thread time beyond this per long task counts as blocking (as in Total Blocking Time).
+LONG_TASK_BLOCKING_MS = 50
+
+
+class PerformanceTelemetry:
+    """Collects Navigation/Resource Timing, click latency, long tasks and heap metrics per session.
+
+    Telemetry must never fail a test on its own, so every driver call is guarded and a
+    failed collection is reported under "errors" instead of raising.
+    """
+
+    def start(self, driver):
+        """Call before the first navigation. Returns a list of setup errors."""
+        errors = []
+        if hasattr(driver, "execute_cdp_cmd"):
+            try:
+                driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": _INSTRUMENT_SCRIPT})
+                driver.execute_cdp_cmd("Performance.enable", {"timeDomain": "timeTicks"})
+            except Exception as e:
+                errors.append(f"cdp setup: {e}")
+        return errors
+
+    def install(self, driver, errors):
+        """Call after page load; a no-op if the new-document script already installed it."""
+        try:
+            driver.execute_script(_INSTRUMENT_SCRIPT)
+        except Exception as e:
+            errors.append(f"instrumentation: {e}")
+
+    def mark_game_start(self, driver, errors):
+        """Long tasks before this point (page load, menus) are excluded from the interaction metrics."""
+        try:
+            driver.execute_script(_MARK_GAME_START_SCRIPT)
+        except Exception as e:
+            errors.append(f"mark game start: {e}")
+
+    def collect(self, driver, errors=None):
+        metrics = {"errors": list(errors or [])}
+        try:
+            metrics.update(driver.execute_script(_COLLECT_SCRIPT) or {})
+        except Exception as e:
+            metrics["errors"].append(f"collect: {e}")
+        if hasattr(driver, "execute_cdp_cmd"):
+            try:
+                response = driver.execute_cdp_cmd("Performance.getMetrics", {})
+                metrics["cdp"] = {m["name"]: m["value"] for m in response.get("metrics", [])}
+            except Exception as e:
+                metrics["errors"].append(f"cdp metrics: {e}")
+        metrics["summary"] = summarize(metrics)
+        return metrics
+
+
+def summarize(metrics):
+    """Reduce raw telemetry to the flat numbers the thresholds are defined on."""
+    summary = {}
+    game_start_ms = metrics.get("game_start_ms")
+    # Clicks before the game started (language and New Game buttons) are not game moves.
+    click_latencies = [
+        c["dom_update_ms"] for c in metrics.get("clicks") or []
+        if c.get("dom_update_ms") is not None and (game_start_ms is None or c["start_ms"] >= game_start_ms)
+    ]
+    if click_latencies:
+        summary["max_click_to_dom_ms"] = max(click_latencies)
+        summary["mean_click_to_dom_ms"] = sum(click_latencies) / len(click_latencies)
+
+    all_long_tasks = metrics.get("long_tasks") or []
+    summary["load_long_task_count"] = len(all_long_tasks)
+    if game_start_ms is not None:
+        # Without a game-start mark the interaction window is unknown, so these are omitted.
+        long_tasks = [t["duration_ms"] for t in all_long_tasks if t["start_ms"] >= game_start_ms]
+        summary["load_long_task_count"] -= len(long_tasks)
+        summary["long_task_count"] = len(long_tasks)
+        summary["max_long_task_ms"] = max(long_tasks, default=0)
+        summary["total_blocking_time_ms"] = sum(max(0, d - LONG_TASK_BLOCKING_MS) for d in long_tasks)
+
+    navigation = metrics.get("navigation") or {}
+    for key in ("ttfb_ms", "dom_content_loaded_ms", "load_event_ms"):
+        if navigation.get(key) is not None:
+            summary[key] = navigation[key]
+
+    heap_bytes = (metrics.get("cdp") or {}).get("JSHeapUsedSize")
+    if heap_bytes is None and metrics.get("js_heap"):
+        heap_bytes = metrics["js_heap"].get("used_bytes")
+    if heap_bytes is not None:
+        summary["js_heap_used_mb"] = heap_bytes / (1024 * 1024)
+    return summary
+
+
+def check_thresholds(performance, thresholds=None):
+    """Return a human-readable violation for every summary metric above its threshold."""
+    if not performance:
+        return []
+    thresholds = DEFAULT_PERFORMANCE_THRESHOLDS if thresholds is None else thresholds
+    summary = performance.get("summary") or {}
+    return [
+        f"{name} = {summary[name]:.1f} exceeds threshold {limit}"
+        for name, limit in thresholds.items()
+        if summary.get(name) is not None and summary[name] > limit
+    ]
@@ -0,0 +1,83 @@
+"""Recall and latency of the IVF/HNSW failure-memory indexes against the exact flat index.
+
+Run from the backend directory:
+    python benchmark_memory.py --sizes 1000 10000 100000 --queries 64
+
+Each index is also searched with a metadata filter (an IDSelector over the ids carrying
+one of `--labels` random labels, as FailureMemory.search does). "filled" is the share of
+the k result slots that came back: flat always fills them, while IVF and HNSW can return
+fewer hits when the filter is selective.
+
+Vectors are synthetic (clustered, unit-normalised, all-MiniLM-L6-v2 sized) so the
+benchmark does not need the embedding model or a populated memory on disk.
+"""
+import argparse
+import time
+import numpy as np
+import faiss
+from agents.memory import build_index, search_params
+
+EMBEDDING_DIM = 384
+
+
+def make_vectors(n, dim, n_clusters, rng):
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, size=n)
+    vectors = centers[labels] + 0.3 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def time_search(index, queries, k, repeats, params=None):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        _, ids = index.search(queries, k, params=params)
+        best = min(best, time.perf_counter() - start)
+    return ids, best
+
+
+def recall_at_k(ids, ground_truth):
+    # -1 marks an empty result slot; it is neither a hit nor a true neighbour.
+    hits = sum(len((set(row) & set(truth)) - {-1}) for row, truth in zip(ids, ground_truth))
+    return hits / max(1, int((ground_truth != -1).sum()))
+
+
+def filled(ids):
+    return float((ids != -1).mean())
+
+
+def run(sizes, n_queries, k, repeats, seed, n_labels):
+    rng = np.random.default_rng(seed)
+    print(f"{'size':>8} {'index':>6} {'filter':>7} {'build_s':>8} {'batch_ms':>9} {'per_query_us':>13} "
+          f"{'recall@' + str(k):>9} {'filled':>7}")
+    for n in sizes:
+        vectors = make_vectors(n, EMBEDDING_DIM, n_clusters=max(8, n // 500), rng=rng)
+        queries = make_vectors(n_queries, EMBEDDING_DIM, n_clusters=8, rng=rng)
+        labels = rng.integers(0, n_labels, size=n)
+        allowed_ids = np.flatnonzero(labels == 0).astype(np.int64)
+        selector = faiss.IDSelectorBatch(len(allowed_ids), faiss.swig_ptr(allowed_ids))
+        ground_truth = {}
+        for index_type in ("flat", "ivf", "hnsw"):
+            start = time.perf_counter()
+            index = build_index(vectors, index_type, nlist=int(4 * np.sqrt(n)))
+            build_s = time.perf_counter() - start
+            for filter_name, params in (("none", None), (f"1/{n_labels}", search_params(index, selector))):
+                ids, search_s = time_search(index, queries, k, repeats, params=params)
+                ground_truth.setdefault(filter_name, ids)
+                recall = recall_at_k(ids, ground_truth[filter_name])
+                print(f"{n:>8} {index_type:>6} {filter_name:>7} {build_s:>8.3f} {search_s * 1e3:>9.2f} "
+                      f"{search_s / n_queries * 1e6:>13.1f} {recall:>9.3f} {filled(ids):>7.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--labels", type=int, default=8,
+                        help="Distinct metadata labels; the filtered search keeps one of them.")
+    args = parser.parse_args()
+    run(args.sizes, args.queries, args.k, args.repeats, args.seed, args.labels)
@@ -7,7 +7,7 @@ from agents.analyzer import AnalyzerAgent
 from agents.orchestrator import OrchestratorAgent
 from agents.ranker import RankerAgent
 from agents.solver import SolverAgent
-import json
+from agents.replay import SessionRecorder, ReplayEngine
 import os
 
 app = FastAPI()
@@ -24,9 +24,12 @@ print("Initializing agents...")
 planner_agent = PlannerAgent()
 ranker_agent = RankerAgent()
 solver_agent = SolverAgent()
-executor_agent = ExecutorAgent(solver=solver_agent) 
+# Set RECORD_SESSIONS=1 to write every executor session to a replayable trace under traces/
+session_recorder = SessionRecorder() if os.getenv("RECORD_SESSIONS") else None
+executor_agent = ExecutorAgent(solver=solver_agent, recorder=session_recorder)
 analyzer_agent = AnalyzerAgent()
 orchestrator_agent = OrchestratorAgent(planner_agent, ranker_agent, executor_agent, analyzer_agent)
+replay_engine = ReplayEngine(solver_agent, analyzer_agent, memory=orchestrator_agent.memory)
 print("All agents initialized.")
 
 @app.get("/report/{file_name}")
@@ -79,21 +82,51 @@ async def execute_test_case(test_case_id: int):
     
     # It's also good practice to analyze the result for a complete report.
     analyzed_result = analyzer_agent.analyze_test_case(result)
+    if session_recorder:
+        session_recorder.record_analysis(analyzed_result)
     return analyzed_result
 # --- END OF FIX ---
 
 @app.get("/get_report/{test_case_id}")
-async def get_report(test_case_id: int):
-    # This might need to be adjusted if reports are named with resolutions
-    report_file_path = os.path.join("report", f"test_case_{test_case_id}_Desktop_report.json") # Assume Desktop for single report fetch
-    if not os.path.exists(report_file_path):
-        raise HTTPException(status_code=404, detail="Report file not found. Check for other resolutions.")
-    
-    with open(report_file_path, "r") as report_file:
-        report = json.load(report_file)
-    return {"report": report}
+def get_report(test_case_id: int, resolution_name: str = None, run_id: str = None):
+    # Plain def so FastAPI runs it in its threadpool: building and saving the view touches disk.
+    # "report" stays the single most recent report; earlier runs are under "history".
+    report_file_path, view = analyzer_agent.report_sink.write_view(test_case_id, resolution_name, run_id)
+    if report_file_path is None:
+        raise HTTPException(status_code=404, detail="Report not found. Check the test case ID, resolution or run.")
+    return {
+        "report": view["report"],
+        "latest_by_resolution": view["latest_by_resolution"],
+        "history": view["history"],
+        "file": os.path.basename(report_file_path),
+    }
 
 @app.post("/orchestrate_tests")
 async def orchestrate_tests():
     results = orchestrator_agent.orchestrate()
-    return {"results": results}
\ No newline at end of file
+    return {"results": results}
+
+@app.on_event("shutdown")
+def flush_reports():
+    analyzer_agent.report_sink.close()
+
+TRACE_DIR = os.path.realpath("traces")
+
+# Plain def: replays call the LLM agents synchronously, so FastAPI runs this in its threadpool.
+@app.post("/replay_traces")
+def replay_traces(trace_path: str = "traces", learn: bool = False):
+    resolved_path = os.path.realpath(trace_path)
+    if os.path.commonpath([resolved_path, TRACE_DIR]) != TRACE_DIR:
+        raise HTTPException(status_code=403, detail="trace_path must be inside the traces directory")
+    if not os.path.exists(resolved_path):
+        raise HTTPException(status_code=404, detail="Trace file or directory not found")
+    return replay_engine.replay(resolved_path, learn=learn)
+
+@app.get("/token_usage")
+async def token_usage():
+    agents = [planner_agent, solver_agent, analyzer_agent]
+    return {
+        "summary": [agent.token_usage.summary() for agent in agents],
+        # Only the most recent calls per agent are kept; the summary covers every call.
+        "recent_calls": [call for agent in agents for call in agent.token_usage.calls],
+    }
@@ -0,0 +1,50 @@
+from agents.prompt_budget import (
+    TRUNCATION_MARKER, TokenBudget, encode_board, estimate_tokens, truncate_to_tokens,
+)
+
+
+def test_encode_board_groups_values_and_collapses_runs():
+    assert encode_board(["8", "1", "8", "8", "2"]) == "8:0,2-3 1:1 2:4"
+    assert encode_board([" 5", "5 ", "5", "3", "5"]) == "5:0-2,4 3:3"
+    assert encode_board([]) == ""
+
+
+def test_truncate_to_tokens_leaves_fitting_text_alone():
+    assert truncate_to_tokens("a" * 40, 10) == "a" * 40
+
+
+def test_truncate_to_tokens_drops_whole_trailing_chunks():
+    chunks = [str(i) * 40 for i in range(5)]
+    truncated = truncate_to_tokens("\n\n".join(chunks), 25)
+    assert truncated == "\n\n".join(chunks[:2] + [TRUNCATION_MARKER])
+    assert estimate_tokens(truncated) <= 25
+
+
+def test_truncate_to_tokens_cuts_characters_without_separators():
+    truncated = truncate_to_tokens("x" * 400, 10)
+    assert truncated == "x" * 26 + TRUNCATION_MARKER
+    assert truncate_to_tokens("x" * 400, 2) == "x" * 8
+    assert truncate_to_tokens("x" * 400, 0) == ""
+
+
+def test_token_budget_fills_by_priority_and_keeps_ranked_chunks_that_fit():
+    budget = TokenBudget(10)
+    fitted = budget.fit([
+        ("context", ["a" * 12, "b" * 40, "c" * 4], 1),
+        ("guidance", "g" * 20, 0),
+    ])
+    assert fitted["guidance"] == "g" * 20
+    # The second-ranked chunk no longer fits once guidance is in, but the third still does.
+    assert fitted["context"] == "a" * 12 + "\n\n" + "c" * 4
+    assert sum(estimate_tokens(text) for text in fitted.values()) <= 10
+
+
+def test_token_budget_cuts_lowest_priority_section_first():
+    fitted = TokenBudget(20).fit([
+        ("board_before", "1:0-9 " * 10, 2),
+        ("expected", "e" * 20, 0),
+        ("board_after", "9:0-3 " * 5, 1),
+    ])
+    assert fitted["expected"] == "e" * 20
+    assert fitted["board_after"] == "9:0-3 " * 5
+    assert fitted["board_before"].endswith(TRUNCATION_MARKER)
@@ -0,0 +1,111 @@
+import os
+
+from agents.replay import ReplayEngine, SessionRecorder, apply_move, load_traces
+
+
+class StubSolver:
+    def __init__(self, indices):
+        self.indices = indices
+
+    def create_action_plan(self, active_elements, test_objective):
+        if self.indices is None:
+            return {"actionable": False}
+        return {"indices_to_click": self.indices}
+
+
+class StubAnalyzer:
+    """Passes a run only if the board changed, mirroring the pair-removal objectives."""
+
+    def analyze_test_case(self, report):
+        before, _, after = report["actual_results"].partition(". Board after: ")
+        verdict = "Passed" if report["actual_results"] and before.removeprefix("Board before: ") != after.rstrip(".") else "Failed"
+        report["analysis"] = {"verdict": verdict, "reason": "stub"}
+        report["status"] = verdict
+        return report
+
+
+def _session(trace_id, board_before, clicked, board_after):
+    return {
+        "trace_id": trace_id, "test_case": {"id": 101, "test_objective": "Remove a pair summing to 10."},
+        "resolution": "1280x1024", "resolution_name": "Desktop",
+        "board_before": board_before, "clicked_indices": clicked, "board_after": board_after,
+    }
+
+
+def _record_run(trace_dir):
+    recorder = SessionRecorder(str(trace_dir))
+    recorder.record(_session("a", ["1", "9", "3"], [0, 1], ["3"]))
+    recorder.record_analysis({"trace_id": "a", "status": "Passed", "analysis": {"verdict": "Passed"}})
+    recorder.record(_session("b", ["4", "6", "5"], [0, 1], ["5"]))
+    recorder.record_analysis({"trace_id": "b", "status": "Passed", "analysis": {"verdict": "Passed"}})
+    return recorder.trace_path
+
+
+def test_apply_move_removes_only_valid_pairs():
+    assert apply_move(["1", "9", "3"], [0, 1]) == ["3"]
+    assert apply_move(["8", "1", "8"], [0, 2]) == ["1"]
+    assert apply_move(["1", "2", "3"], [0, 1]) == ["1", "2", "3"]
+    assert apply_move(["5", "2"], [0, 0]) == ["5", "2"]
+    assert apply_move(["5", "5"], [0, 7]) == ["5", "5"]
+
+
+def test_load_traces_attaches_recorded_analysis(tmp_path):
+    _record_run(tmp_path)
+    sessions = list(load_traces(str(tmp_path)))
+    assert [s["trace_id"] for s in sessions] == ["a", "b"]
+    assert sessions[0]["recorded_analysis"]["verdict"] == "Passed"
+    assert sessions[0]["resolution_name"] == "Desktop"
+
+
+def test_load_traces_skips_torn_tail(tmp_path):
+    trace_path = _record_run(tmp_path)
+    with open(trace_path, "rb+") as trace_file:
+        trace_file.truncate(os.path.getsize(trace_path) - 10)
+
+    damaged = []
+    sessions = list(load_traces(trace_path, damaged=damaged))
+    assert [s["trace_id"] for s in sessions] == ["a", "b"]
+    assert sessions[1]["recorded_analysis"] is None
+    assert damaged and damaged[0]["error"] == "truncated gzip member"
+
+
+def test_replay_reports_plan_divergence_and_verdict_changes(tmp_path):
+    _record_run(tmp_path)
+    # Picks an invalid pair, so the simulated board is unchanged and the stub analyzer fails it.
+    engine = ReplayEngine(StubSolver([0, 2]), StubAnalyzer())
+    out = engine.replay(str(tmp_path))
+
+    summary = out["summary"]
+    assert summary["sessions"] == 2
+    assert summary["diverged_from_recording"] == ["a", "b"]
+    assert [c["trace_id"] for c in summary["verdict_changes"]] == ["a", "b"]
+    assert all(c["recorded"] == "Passed" and c["replayed"] == "Failed" for c in summary["verdict_changes"])
+    assert out["results"][0]["resolution_name"] == "Desktop"
+
+
+def test_replay_reuses_recorded_board_when_plan_matches(tmp_path):
+    _record_run(tmp_path)
+    out = ReplayEngine(StubSolver([0, 1]), StubAnalyzer()).replay(str(tmp_path))
+    assert out["summary"]["diverged_from_recording"] == []
+    assert out["summary"]["verdict_changes"] == []
+    assert out["results"][0]["actual_results"] == "Board before: ['1', '9', '3']. Board after: ['3']."
+
+
+def test_replay_keeps_recorded_error_when_plan_matches(tmp_path):
+    recorder = SessionRecorder(str(tmp_path))
+    session = _session("c", ["1", "9", "3"], [0, 1], None)
+    session["error"] = "Execution failed with error: stale element reference"
+    recorder.record(session)
+    recorder.record_analysis({"trace_id": "c", "status": "Failed", "analysis": {"verdict": "Failed"}})
+
+    out = ReplayEngine(StubSolver([0, 1]), StubAnalyzer()).replay(str(tmp_path))
+    report = out["results"][0]
+    assert report["status"] == "Failed"
+    assert report["actual_log"] == session["error"]
+    assert out["summary"]["diverged_from_recording"] == []
+    assert out["summary"]["verdict_changes"] == []
+
+    # A different pair never ran live, so it is simulated instead of inheriting the error.
+    out = ReplayEngine(StubSolver([1, 0]), StubAnalyzer()).replay(str(tmp_path))
+    assert out["results"][0]["actual_results"] == "Board before: ['1', '9', '3']. Board after: ['3']."
+    assert out["summary"]["diverged_from_recording"] == ["c"]
@@ -0,0 +1,95 @@
+import json
+import os
+import threading
+
+from agents.report_sink import LEGACY_RUN_ID, ReportSink
+
+
+def _report(test_case_id, resolution_name="Desktop", status="Passed", **extra):
+    return {"test_case_id": test_case_id, "resolution_name": resolution_name, "status": status, **extra}
+
+
+def test_submit_is_readable_before_and_after_flush(tmp_path):
+    sink = ReportSink(str(tmp_path), flush_interval=60)
+    try:
+        sink.submit(_report(101))
+        sink.submit(_report(101, "Mobile", "Failed"))
+        sink.submit(_report(102))
+        # Still queued (the writer waits for a full batch or the interval), but visible.
+        assert [r["resolution_name"] for r in sink.load_reports(101)] == ["Desktop", "Mobile"]
+
+        sink.flush()
+        with open(sink.log_path, encoding="utf-8") as log_file:
+            assert [json.loads(line)["test_case_id"] for line in log_file] == [101, 101, 102]
+        assert not sink._pending_lines
+        view = sink.build_view(101)
+        assert view["report"]["status"] == "Failed"
+        assert set(view["latest_by_resolution"]) == {"Desktop", "Mobile"}
+        assert sink.load_reports(101, resolution_name="Mobile")[0]["status"] == "Failed"
+    finally:
+        sink.close()
+
+
+def test_history_spans_runs_skips_torn_lines_and_replays(tmp_path):
+    first = ReportSink(str(tmp_path), run_id="20260101_000000_1_a")
+    first.submit(_report(101, status="Failed"))
+    first.submit(_report(101, replayed_from="trace-1"))
+    first.close()
+    with open(first.log_path, "a", encoding="utf-8") as log_file:
+        log_file.write('{"test_case_id": 101, "stat')
+
+    second = ReportSink(str(tmp_path), run_id="20260102_000000_1_b")
+    try:
+        second.submit(_report(101))
+        second.flush()
+        history = second.load_reports(101)
+        assert [(r["run_id"], r["status"]) for r in history] == [
+            ("20260101_000000_1_a", "Failed"), ("20260102_000000_1_b", "Passed"),
+        ]
+        assert second.build_view(101, run_id="20260101_000000_1_a")["runs"] == 1
+    finally:
+        second.close()
+
+
+def test_legacy_reports_are_migrated_once_as_oldest_history(tmp_path):
+    with open(tmp_path / "test_case_7_Desktop_1920x1080_report.json", "w", encoding="utf-8") as legacy_file:
+        json.dump(_report(7, status="Failed"), legacy_file)
+    sink = ReportSink(str(tmp_path))
+    try:
+        sink.submit(_report(7))
+        sink.flush()
+        assert [r["run_id"] for r in sink.load_reports(7)] == [LEGACY_RUN_ID, sink.run_id]
+    finally:
+        sink.close()
+    assert ReportSink(str(tmp_path)).load_reports(7)[0]["status"] == "Failed"
+
+
+def test_concurrent_write_view(tmp_path):
+    sink = ReportSink(str(tmp_path))
+    try:
+        sink.submit(_report(101))
+        sink.flush()
+        errors, paths = [], []
+        barrier = threading.Barrier(8)
+
+        def write():
+            barrier.wait()
+            try:
+                paths.append(sink.write_view(101)[0])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert len(set(paths)) == 1
+        with open(paths[0], encoding="utf-8") as view_file:
+            assert json.load(view_file)["report"]["test_case_id"] == 101
+        assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+        assert sink.write_view(999) == (None, sink.build_view(999))
+    finally:
+        sink.close()
@@ -0,0 +1,62 @@
+from agents.telemetry import DEFAULT_PERFORMANCE_THRESHOLDS, check_thresholds, summarize
+
+
+def _metrics(**overrides):
+    metrics = {
+        "game_start_ms": 1000,
+        "clicks": [
+            {"start_ms": 400, "dom_update_ms": 900},  # New Game button, before the mark
+            {"start_ms": 1500, "dom_update_ms": 40},
+            {"start_ms": 2100, "dom_update_ms": 80},
+            {"start_ms": 2600, "dom_update_ms": None},  # no DOM mutation observed
+        ],
+        "long_tasks": [
+            {"start_ms": 100, "duration_ms": 600},  # page load
+            {"start_ms": 1600, "duration_ms": 120},
+            {"start_ms": 2200, "duration_ms": 30},
+        ],
+        "navigation": {"ttfb_ms": 50, "dom_content_loaded_ms": 4000, "load_event_ms": None},
+        "cdp": {"JSHeapUsedSize": 20 * 1024 * 1024},
+    }
+    metrics.update(overrides)
+    return metrics
+
+
+def test_summarize_only_counts_interaction_after_game_start():
+    summary = summarize(_metrics())
+    assert summary["max_click_to_dom_ms"] == 80
+    assert summary["mean_click_to_dom_ms"] == 60
+    assert summary["long_task_count"] == 2
+    assert summary["load_long_task_count"] == 1
+    assert summary["max_long_task_ms"] == 120
+    assert summary["total_blocking_time_ms"] == 70
+    assert summary["dom_content_loaded_ms"] == 4000
+    assert "load_event_ms" not in summary
+    assert summary["js_heap_used_mb"] == 20
+
+
+def test_summarize_without_game_start_mark_omits_long_task_metrics():
+    summary = summarize(_metrics(game_start_ms=None))
+    assert summary["max_click_to_dom_ms"] == 900
+    assert summary["load_long_task_count"] == 3
+    assert "max_long_task_ms" not in summary
+    assert "total_blocking_time_ms" not in summary
+
+
+def test_summarize_handles_empty_metrics():
+    assert summarize({"errors": ["collect: no driver"]}) == {"load_long_task_count": 0}
+
+
+def test_check_thresholds_reports_only_exceeded_metrics():
+    performance = {"summary": summarize(_metrics())}
+    assert check_thresholds(performance) == []
+    assert check_thresholds(performance, {"max_click_to_dom_ms": 50, "dom_content_loaded_ms": 3000}) == [
+        "max_click_to_dom_ms = 80.0 exceeds threshold 50",
+        "dom_content_loaded_ms = 4000.0 exceeds threshold 3000",
+    ]
+
+
+def test_check_thresholds_ignores_missing_metrics_and_performance():
+    assert check_thresholds(None) == []
+    assert check_thresholds({"summary": {}}, DEFAULT_PERFORMANCE_THRESHOLDS) == []
+    assert check_thresholds({"summary": {"max_long_task_ms": 250}}, {}) == []